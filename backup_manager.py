@@ -1,33 +1,145 @@
 """Backup and recovery management for user data"""
 
+import hashlib
 import json
 import os
 import shutil
+import time
 from datetime import datetime
 import logging
 from config import BACKUP_FOLDER, MAX_BACKUPS, DATA_FILE
+from utils import dumps_json, loads_json, write_atomic
+
+try:
+    import zstandard
+except ImportError:
+    # zstandard is optional; backups are stored as plain JSON without it
+    zstandard = None
+
+try:
+    import ijson
+except ImportError:
+    # ijson is optional; without it every backup is verified with a full parse
+    ijson = None
 
 logger = logging.getLogger(__name__)
 
+# Every backup filename starts with this, followed by a %Y%m%d_%H%M%S UTC timestamp
+_BACKUP_PREFIX = "user_data_backup_"
+
+# Backup folder with a trailing separator, so paths are built by concatenation
+_BACKUP_DIR = os.path.join(BACKUP_FOLDER, "")
+
+# Set once the backup folder is known to exist, so later calls skip the filesystem
+_folder_ready = False
+
+# Uncompressed backups at least this large are verified by streaming parse events when
+# ijson is available
+_STREAM_VERIFY_MIN_SIZE = 1024 * 1024
+
+# (path, digest) of the last backup, used to skip backing up unchanged data; seeded
+# from the newest backup on disk, so restarts don't back up the same data again
+_last_backup = None
+_last_backup_seeded = False
+
+# Backup files on disk, or None until cleanup_old_backups has counted them
+_backup_count = None
+
+def _backup_timestamp():
+    """UTC time formatted for backup filenames (%Y%m%d_%H%M%S)
+
+    UTC never repeats an hour, unlike local time on a DST fall-back, so the
+    names sort in the order the backups were taken.
+    """
+    return time.strftime("%Y%m%d_%H%M%S", time.gmtime())
+
+def _encode_backup(data, pretty=False):
+    """Serialize backup data, returning (file payload, file extension)
+
+    data may also be JSON bytes that are already encoded, which are used as-is.
+    """
+    raw = data if isinstance(data, bytes) else dumps_json(data, pretty=pretty)
+    return _compress_backup(raw, pretty)
+
+def _compress_backup(raw, pretty=False):
+    """Return (file payload, file extension) for backup JSON bytes
+
+    Backups are zstd-compressed when zstandard is installed. Pretty backups
+    are meant to be read by humans, so they are always left uncompressed.
+    """
+    if zstandard is None or pretty:
+        return raw, ".json"
+    return zstandard.ZstdCompressor(level=3).compress(raw), ".json.zst"
+
+def _read_backup_bytes(backup_path):
+    """Return the JSON bytes of a backup file, decompressing it if it was written with zstd"""
+    with open(backup_path, 'rb') as f:
+        payload = f.read()
+    if backup_path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read compressed backups")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    return payload
+
+def _read_backup(backup_path):
+    """Load a backup file, decompressing it if it was written with zstd"""
+    return loads_json(_read_backup_bytes(backup_path))
+
+def _backup_digest(raw):
+    """Digest of backup JSON bytes, compared to tell whether data changed"""
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+def _seed_last_backup():
+    """Set _last_backup from the newest backup on disk, once per process"""
+    global _last_backup, _last_backup_seeded
+    _last_backup_seeded = True
+    try:
+        backup_files = _backup_names()
+        if backup_files:
+            backup_path = _BACKUP_DIR + backup_files[0]
+            _last_backup = (backup_path, _backup_digest(_read_backup_bytes(backup_path)))
+    except Exception as e:
+        # Without a seed the next backup is simply written, as on a first run
+        logger.warning(f"Could not read the newest backup: {e}")
+
 def ensure_backup_folder():
     """Ensure backup folder exists"""
-    if not os.path.exists(BACKUP_FOLDER):
+    global _folder_ready
+    if _folder_ready:
+        return
+    try:
         os.makedirs(BACKUP_FOLDER)
         logger.info(f"Created backup folder: {BACKUP_FOLDER}")
+    except FileExistsError:
+        pass
+    _folder_ready = True
 
 def backup_data(data):
-    """Create a backup of user data"""
+    """Create a backup of user data, given as a dict or as encoded JSON bytes"""
+    global _last_backup
     try:
         ensure_backup_folder()
         
+        raw = data if isinstance(data, bytes) else dumps_json(data)
+        if not _last_backup_seeded:
+            _seed_last_backup()
+        
+        # Unchanged data keeps the previous backup rather than taking a rotation slot;
+        # the digest covers the JSON bytes, so a skipped backup is never compressed
+        digest = _backup_digest(raw)
+        if _last_backup is not None and _last_backup[1] == digest and os.path.exists(_last_backup[0]):
+            logger.debug("Data unchanged since the last backup, skipping")
+            return _last_backup[0]
+        payload, extension = _compress_backup(raw)
+        
         # Create timestamped backup filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_filename = f"user_data_backup_{timestamp}.json"
-        backup_path = os.path.join(BACKUP_FOLDER, backup_filename)
+        timestamp = _backup_timestamp()
+        backup_filename = f"{_BACKUP_PREFIX}{timestamp}{extension}"
+        backup_path = _BACKUP_DIR + backup_filename
         
-        # Save backup
-        with open(backup_path, 'w') as f:
-            json.dump(data, f, indent=4)
+        write_atomic(backup_path, payload)
+        _last_backup = (backup_path, digest)
+        _count_new_backup()
         
         logger.info(f"Created backup: {backup_filename}")
         
@@ -40,29 +152,65 @@ def backup_data(data):
         logger.error(f"Error creating backup: {e}")
         return None
 
+def _backup_names():
+    """Return backup filenames, newest first
+
+    Filenames embed a %Y%m%d_%H%M%S UTC timestamp, so lexical order is
+    chronological and no stat calls are needed to sort them. Backups named
+    in local time by older versions can sort out of place against UTC names
+    by up to the UTC offset, until they have been rotated out.
+    """
+    with os.scandir(BACKUP_FOLDER) as entries:
+        names = [entry.name for entry in entries if entry.name.startswith(_BACKUP_PREFIX)]
+    names.sort(reverse=True)
+    return names
+
+def _scan_backups():
+    """Return (filename, mtime, size) for every backup file in one directory pass"""
+    with os.scandir(BACKUP_FOLDER) as entries:
+        backups = []
+        for entry in entries:
+            if entry.name.startswith(_BACKUP_PREFIX):
+                # DirEntry caches its stat result, so mtime and size cost one syscall
+                stat = entry.stat()
+                backups.append((entry.name, stat.st_mtime, stat.st_size))
+    return backups
+
+def _count_new_backup():
+    """Track a newly written backup file in the running count"""
+    global _backup_count
+    if _backup_count is not None:
+        _backup_count += 1
+
 def cleanup_old_backups():
     """Remove old backup files, keeping only the most recent MAX_BACKUPS"""
+    global _backup_count
     try:
+        # Nothing to rotate until the known count goes over the limit
+        if _backup_count is not None and _backup_count <= MAX_BACKUPS:
+            return
+        
         if not os.path.exists(BACKUP_FOLDER):
             return
         
-        # Get all backup files
-        backup_files = [f for f in os.listdir(BACKUP_FOLDER) if f.startswith("user_data_backup_")]
+        # Get all backup files (newest first)
+        backup_files = _backup_names()
+        _backup_count = len(backup_files)
         
         if len(backup_files) <= MAX_BACKUPS:
             return
         
-        # Sort by modification time (newest first)
-        backup_files.sort(key=lambda x: os.path.getmtime(os.path.join(BACKUP_FOLDER, x)), reverse=True)
-        
         # Remove excess backups
         files_to_remove = backup_files[MAX_BACKUPS:]
         for filename in files_to_remove:
-            file_path = os.path.join(BACKUP_FOLDER, filename)
+            file_path = _BACKUP_DIR + filename
             os.remove(file_path)
+            _backup_count -= 1
             logger.info(f"Removed old backup: {filename}")
             
     except Exception as e:
+        # Recount from disk next time rather than trust a partial update
+        _backup_count = None
         logger.error(f"Error cleaning up backups: {e}")
 
 def restore_data():
@@ -70,22 +218,18 @@ def restore_data():
     try:
         ensure_backup_folder()
         
-        # Get all backup files
-        backup_files = [f for f in os.listdir(BACKUP_FOLDER) if f.startswith("user_data_backup_")]
+        # Get all backup files (newest first)
+        backup_files = _backup_names()
         
         if not backup_files:
             logger.warning("No backup files found")
             return None
         
-        # Sort by modification time (newest first)
-        backup_files.sort(key=lambda x: os.path.getmtime(os.path.join(BACKUP_FOLDER, x)), reverse=True)
-        
         # Load the most recent backup
         latest_backup = backup_files[0]
-        backup_path = os.path.join(BACKUP_FOLDER, latest_backup)
+        backup_path = _BACKUP_DIR + latest_backup
         
-        with open(backup_path, 'r') as f:
-            data = json.load(f)
+        data = _read_backup(backup_path)
         
         logger.info(f"Restored data from backup: {latest_backup}")
         return data
@@ -97,14 +241,13 @@ def restore_data():
 def restore_from_specific_backup(backup_filename):
     """Restore data from a specific backup file"""
     try:
-        backup_path = os.path.join(BACKUP_FOLDER, backup_filename)
+        backup_path = _BACKUP_DIR + backup_filename
         
         if not os.path.exists(backup_path):
             logger.error(f"Backup file not found: {backup_filename}")
             return None
         
-        with open(backup_path, 'r') as f:
-            data = json.load(f)
+        data = _read_backup(backup_path)
         
         logger.info(f"Restored data from specific backup: {backup_filename}")
         return data
@@ -113,48 +256,48 @@ def restore_from_specific_backup(backup_filename):
         logger.error(f"Error restoring from specific backup {backup_filename}: {e}")
         return None
 
+def format_mtime(timestamp):
+    """Format a backup's raw mtime as a local ISO 8601 string"""
+    return datetime.fromtimestamp(timestamp).isoformat()
+
 def list_backups():
-    """List all available backup files"""
+    """List all available backup files
+
+    Each entry's "mtime" is a raw timestamp; use format_mtime to display it.
+    """
     try:
         ensure_backup_folder()
         
-        backup_files = [f for f in os.listdir(BACKUP_FOLDER) if f.startswith("user_data_backup_")]
-        
-        if not backup_files:
-            return []
+        backup_files = _scan_backups()
         
-        # Sort by modification time (newest first)
-        backup_files.sort(key=lambda x: os.path.getmtime(os.path.join(BACKUP_FOLDER, x)), reverse=True)
+        # Sort by embedded timestamp (newest first)
+        backup_files.sort(reverse=True)
         
-        backup_info = []
-        for filename in backup_files:
-            file_path = os.path.join(BACKUP_FOLDER, filename)
-            mod_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-            file_size = os.path.getsize(file_path)
-            
-            backup_info.append({
+        return [
+            {
                 "filename": filename,
-                "modified": mod_time,
-                "size": file_size
-            })
-        
-        return backup_info
+                "mtime": mtime,
+                "size": size
+            }
+            for filename, mtime, size in backup_files
+        ]
         
     except Exception as e:
         logger.error(f"Error listing backups: {e}")
         return []
 
-def create_manual_backup(data, suffix="manual"):
-    """Create a manual backup with custom suffix"""
+def create_manual_backup(data, suffix="manual", pretty=False):
+    """Create a manual backup with custom suffix, indented when pretty is set"""
     try:
         ensure_backup_folder()
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_filename = f"user_data_backup_{timestamp}_{suffix}.json"
-        backup_path = os.path.join(BACKUP_FOLDER, backup_filename)
+        timestamp = _backup_timestamp()
+        payload, extension = _encode_backup(data, pretty=pretty)
+        backup_filename = f"{_BACKUP_PREFIX}{timestamp}_{suffix}{extension}"
+        backup_path = _BACKUP_DIR + backup_filename
         
-        with open(backup_path, 'w') as f:
-            json.dump(data, f, indent=4)
+        write_atomic(backup_path, payload)
+        _count_new_backup()
         
         logger.info(f"Created manual backup: {backup_filename}")
         return backup_path
@@ -163,28 +306,62 @@ def create_manual_backup(data, suffix="manual"):
         logger.error(f"Error creating manual backup: {e}")
         return None
 
+def _verify_backup_stream(backup_path):
+    """Check backup structure from ijson parse events without building the data"""
+    with open(backup_path, 'rb') as f:
+        stream = f
+        if backup_path.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read compressed backups")
+            stream = zstandard.ZstdDecompressor().stream_reader(f)
+        
+        # Expect {"<user_id>": {...}, ...}: only map keys and maps at depth 1
+        depth = 0
+        user_id = None
+        try:
+            for _, event, value in ijson.parse(stream):
+                if depth == 0 and event != "start_map":
+                    return False, "Invalid data structure - not a dictionary"
+                if depth == 1:
+                    if event == "map_key":
+                        user_id = value
+                    elif event not in ("start_map", "end_map"):
+                        return False, f"Invalid user data structure for user {user_id}"
+                if event in ("start_map", "start_array"):
+                    depth += 1
+                elif event in ("end_map", "end_array"):
+                    depth -= 1
+        except ijson.JSONError as e:
+            return False, f"Invalid JSON format: {e}"
+    
+    return True, "Backup integrity verified"
+
 def verify_backup_integrity(backup_filename):
     """Verify that a backup file is valid JSON and contains expected structure"""
     try:
-        backup_path = os.path.join(BACKUP_FOLDER, backup_filename)
+        backup_path = _BACKUP_DIR + backup_filename
         
         if not os.path.exists(backup_path):
             return False, "Backup file not found"
         
-        with open(backup_path, 'r') as f:
-            data = json.load(f)
+        # Large backups are checked as a stream, stopping at the first bad entry. The
+        # size on disk of a .zst backup says little about its JSON size, so those
+        # are always streamed
+        if ijson is not None and (
+            backup_path.endswith(".zst") or os.path.getsize(backup_path) >= _STREAM_VERIFY_MIN_SIZE
+        ):
+            return _verify_backup_stream(backup_path)
+        
+        data = _read_backup(backup_path)
         
         # Basic structure validation
         if not isinstance(data, dict):
             return False, "Invalid data structure - not a dictionary"
         
-        # Check if all user IDs are valid strings
-        for user_id, user_data in data.items():
-            if not isinstance(user_id, str):
-                return False, f"Invalid user ID format: {user_id}"
-            
-            if not isinstance(user_data, dict):
-                return False, f"Invalid user data structure for user {user_id}"
+        # JSON object keys always decode as str, so only the values need checking
+        if not all(isinstance(user_data, dict) for user_data in data.values()):
+            user_id = next(uid for uid, user_data in data.items() if not isinstance(user_data, dict))
+            return False, f"Invalid user data structure for user {user_id}"
         
         return True, "Backup integrity verified"
         
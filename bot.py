@@ -4,88 +4,129 @@ from pathlib import Path
 
 load_dotenv(dotenv_path=Path('.') / '.env')
 
-# Keep the bot alive using Flask
-from keep_alive import keep_alive
-keep_alive()
-
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 
-import json
+import asyncio
+import atexit
 import logging
-from datetime import datetime
-from mercy_tracker import update_tracker, get_status, get_mercy_rules_info, validate_shard_type
-from backup_manager import backup_data, restore_data
-from utils import format_progress_bar, validate_amount, get_shard_emoji
-from config import VALID_SHARD_TYPES, MAX_AMOUNT_PER_COMMAND
-
-# Configure logging
+import queue
+import signal
+from logging.handlers import QueueHandler, QueueListener
+from functools import partial
+from datetime import datetime, timezone
+from mercy_tracker import get_status, get_mercy_rules_info
+from backup_manager import backup_data
+from repo import JsonMercyRepo, MercyRepo
+from keep_alive import keep_alive
+from utils import format_progress_bar, get_shard_emoji
+from config import VALID_SHARD_TYPES, MAX_AMOUNT_PER_COMMAND, SAVE_INTERVAL_SECONDS, BACKUP_INTERVAL_MINUTES
+
+# Configure logging; records are queued and written to the file and console by a
+# background thread, so handlers never wait on log I/O
+log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+file_handler = logging.FileHandler('bot.log', delay=True)
+stream_handler = logging.StreamHandler()
+file_handler.setFormatter(log_formatter)
+stream_handler.setFormatter(log_formatter)
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, file_handler, stream_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
+    handlers=[QueueHandler(log_queue)]
 )
 logger = logging.getLogger(__name__)
 
-intents = discord.Intents.default()
-intents.message_content = True
+# Slash commands, components and modals arrive as interactions, so the only
+# gateway intent needed is guilds (for channel and guild caching)
+intents = discord.Intents.none()
+intents.guilds = True
 
 bot = commands.Bot(command_prefix="!", intents=intents)
 tree = bot.tree
 
 DATA_FILE = "user_data.json"
 
-def load_data():
-    try:
-        with open(DATA_FILE, "r") as f:
-            data = json.load(f)
-            logger.info(f"Loaded data for {len(data)} users")
-            return data
-    except FileNotFoundError:
-        logger.info("No existing data file found, starting with empty data")
-        return {}
-    except json.JSONDecodeError as e:
-        logger.error(f"Error decoding JSON data: {e}")
-        backup_data_restored = restore_data()
-        if backup_data_restored:
-            logger.info("Restored data from backup")
-            return backup_data_restored
-        return {}
-    except Exception as e:
-        logger.error(f"Unexpected error loading data: {e}")
-        return {}
+bot.repo: MercyRepo = JsonMercyRepo(DATA_FILE)
+
+@tasks.loop(seconds=SAVE_INTERVAL_SECONDS)
+async def flush_loop():
+    """Coalesce shard updates into at most one save every SAVE_INTERVAL_SECONDS"""
+    await bot.repo.flush_async()
 
-def save_data(data):
+@tasks.loop(minutes=BACKUP_INTERVAL_MINUTES)
+async def backup_loop():
+    """Snapshot user data to the backup folder every BACKUP_INTERVAL_MINUTES"""
+    await asyncio.to_thread(backup_data, bot.repo.backup_payload())
+
+# aiohttp runner serving the keep-alive ping, or None if it couldn't start
+bot.web_runner = None
+
+# Task closing the bot after SIGTERM; held here so it isn't garbage-collected mid-close
+bot.close_task = None
+
+def close_on_sigterm():
+    """Start closing the bot, once, from the SIGTERM handler"""
+    if bot.close_task is None:
+        bot.close_task = asyncio.get_running_loop().create_task(bot.close())
+
+@bot.event
+async def setup_hook():
+    # Keep the bot alive by answering uptime pings on the same event loop; the bot
+    # itself doesn't need the ping server, so failing to bind the port isn't fatal
     try:
-        backup_data(data)
-        with open(DATA_FILE, "w") as f:
-            json.dump(data, f, indent=4)
-        logger.info(f"Saved data for {len(data)} users")
-    except Exception as e:
-        logger.error(f"Error saving data: {e}")
-        raise
+        bot.web_runner = await keep_alive()
+    except OSError as e:
+        logger.error("Could not start the keep-alive server: %s", e)
+    # Parse the data file off the event loop; this runs before the gateway connects,
+    # so no command can see the repository before it is loaded
+    await asyncio.to_thread(bot.repo.load)
+    flush_loop.start()
+    backup_loop.start()
+    try:
+        # Close cleanly on SIGTERM so bot.run returns and pending changes get flushed
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, close_on_sigterm)
+    except NotImplementedError:
+        # Signal handlers aren't available on Windows event loops
+        pass
 
-user_data = load_data()
+_client_close = bot.close
+
+async def close():
+    """Stop the keep-alive server, then close the bot as usual"""
+    if bot.web_runner is not None:
+        await bot.web_runner.cleanup()
+        bot.web_runner = None
+    await _client_close()
+
+# bot.run closes the client through bot.close, so the cleanup goes in front of it
+bot.close = close
+
+# Set after the first successful tree.sync(); on_ready fires again on every reconnect
+_commands_synced = False
 
 @bot.event
 async def on_ready():
+    global _commands_synced
     print(f"Logged in as {bot.user}")
-    logger.info(f"Bot {bot.user} is ready")
+    logger.info("Bot %s is ready", bot.user)
+    if _commands_synced:
+        return
     try:
         synced = await tree.sync()
+        _commands_synced = True
         print(f"Synced {len(synced)} commands.")
-        logger.info(f"Synced {len(synced)} slash commands")
+        logger.info("Synced %d slash commands", len(synced))
     except Exception as e:
         print(f"Failed to sync commands: {e}")
-        logger.error(f"Failed to sync commands: {e}")
+        logger.error("Failed to sync commands: %s", e)
 
 @bot.event
 async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
-    logger.error(f"Command error in {interaction.command.name}: {error}")
+    logger.error("Command error in %s: %s", interaction.command.name, error)
     if interaction.response.is_done():
         await interaction.followup.send("An error occurred while processing your command.", ephemeral=True)
     else:
@@ -93,6 +134,17 @@ async def on_app_command_error(interaction: discord.Interaction, error: app_comm
 
 # ----------- OPEN SHARD FLOW -----------
 
+# (emoji, label) for every tracked shard key, e.g. "primal_legendary" -> Legendary
+SHARD_DISPLAY = {
+    key: (get_shard_emoji(key), (key[len("primal_"):] if key.startswith("primal_") else key).title())
+    for key in VALID_SHARD_TYPES
+}
+
+# Full name for every tracked shard key, e.g. "primal_legendary" -> Primal Legendary
+SHARD_TITLES = {key: key.replace("_", " ").title() for key in VALID_SHARD_TYPES}
+
+INVALID_AMOUNT_MSG = f"❌ Invalid amount. Must be between 1 and {MAX_AMOUNT_PER_COMMAND}."
+
 @tree.command(name="open", description="Choose the shard type")
 async def open_shard(interaction: discord.Interaction):
     view = ShardSelectFirstView(interaction.user.id)
@@ -100,189 +152,172 @@ async def open_shard(interaction: discord.Interaction):
         content="Choose the shard type:", view=view, ephemeral=True
     )
 
-class ShardSelectFirstView(discord.ui.View):
-    def __init__(self, user_id: int):
-        super().__init__(timeout=60)
-        self.user_id = user_id
-
-    @discord.ui.button(label="Ancient", style=discord.ButtonStyle.secondary, emoji=get_shard_emoji("ancient"))
-    async def ancient(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self.ask_amount(interaction, "ancient")
-
-    @discord.ui.button(label="Void", style=discord.ButtonStyle.secondary, emoji=get_shard_emoji("void"))
-    async def void(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self.ask_amount(interaction, "void")
-
-    @discord.ui.button(label="Sacred", style=discord.ButtonStyle.secondary, emoji=get_shard_emoji("sacred"))
-    async def sacred(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self.ask_amount(interaction, "sacred")
+class AmountModal(discord.ui.Modal):
+    """Asks how many shards were opened and adds the amount to each of keys"""
 
-    @discord.ui.button(label="Primal", style=discord.ButtonStyle.secondary, emoji=get_shard_emoji("primal"))
-    async def primal(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message("❌ This isn't your selection.", ephemeral=True)
-            return
-        await interaction.response.edit_message(
-            content="Choose an option for Primal shard:", view=PrimalRarityAmountView(self.user_id)
-        )
-
-    @discord.ui.button(label="Remnant", style=discord.ButtonStyle.secondary, emoji=get_shard_emoji("remnant"))
-    async def remnant(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self.ask_amount(interaction, "remnant")
+    amount = discord.ui.TextInput(
+        label=f"Amount opened (1-{MAX_AMOUNT_PER_COMMAND})",
+        max_length=len(str(MAX_AMOUNT_PER_COMMAND))
+    )
 
-    async def ask_amount(self, interaction: discord.Interaction, shard_type: str):
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message("❌ This isn't your selection.", ephemeral=True)
+    def __init__(self, user_key: str, keys, label: str):
+        super().__init__(title=f"{label} Shards")
+        self.user_key = user_key
+        self.keys = keys
+
+    async def on_submit(self, interaction: discord.Interaction):
+        value = self.amount.value.strip()
+        # isdecimal, unlike isdigit, only passes characters int() accepts (not e.g. "²")
+        amount = int(value) if value.isdecimal() else 0
+        if not 1 <= amount <= MAX_AMOUNT_PER_COMMAND:
+            await interaction.response.send_message(INVALID_AMOUNT_MSG, ephemeral=True)
             return
-        await interaction.response.send_message(
-            f"{interaction.user.mention}, please enter the amount of {shard_type.title()} shards you opened (1-{MAX_AMOUNT_PER_COMMAND}):"
-        )
 
-        def check(m):
-            return (
-                m.author.id == interaction.user.id
-                and m.channel == interaction.channel
-                and m.content.isdigit()
+        repo = bot.repo
+        if len(self.keys) == 1:
+            key = self.keys[0]
+            emoji, label = SHARD_DISPLAY[key]
+            description = f"{emoji} {label}: +{amount} (Total: {repo.add(self.user_key, key, amount)})"
+        else:
+            totals = [repo.add(self.user_key, k, amount) for k in self.keys]
+            description = "\n".join(
+                f"{SHARD_DISPLAY[k][0]} {SHARD_DISPLAY[k][1]}: +{amount} (Total: {total})"
+                for k, total in zip(self.keys, totals)
             )
 
-        try:
-            msg = await bot.wait_for("message", check=check, timeout=30)
-            amount = int(msg.content)
-            if not validate_amount(amount):
-                await interaction.followup.send(
-                    f"❌ Invalid amount. Must be between 1 and {MAX_AMOUNT_PER_COMMAND}.", ephemeral=True
-                )
-                return
-
-            user_id_str = str(self.user_id)
-            if user_id_str not in user_data:
-                user_data[user_id_str] = {}
+        embed = discord.Embed(
+            title="✅ Shard Update Complete",
+            description=description,
+            color=0x00ff00,
+            timestamp=datetime.now(timezone.utc)
+        )
+        embed.set_footer(text=f"User: {interaction.user.display_name}")
 
-            update_tracker(user_data[user_id_str], shard_type, amount)
-            new_total = user_data[user_id_str][shard_type]
-            save_data(user_data)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
-            emoji = get_shard_emoji(shard_type)
-            embed = discord.Embed(
-                title="✅ Shard Update Complete",
-                description=f"{emoji} {shard_type.title()}: +{amount} (Total: {new_total})",
-                color=0x00ff00,
-                timestamp=datetime.utcnow()
-            )
-            embed.set_footer(text=f"User: {interaction.user.display_name}")
-
-            await interaction.followup.send(embed=embed, ephemeral=True)
-        except Exception:
-            await interaction.followup.send("❌ No valid amount received. Please try again.", ephemeral=True)
+class ShardPickerView(discord.ui.View):
+    """Base for the /open pickers: only user_id may use them"""
 
-class PrimalRarityAmountView(discord.ui.View):
     def __init__(self, user_id: int):
         super().__init__(timeout=60)
         self.user_id = user_id
+        # user_data key for this user, converted once rather than on every pick
+        self.user_key = str(user_id)
 
-    @discord.ui.button(label="Legendary", style=discord.ButtonStyle.secondary, emoji=get_shard_emoji("primal_legendary"))
-    async def legendary(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self.ask_amount(interaction, "primal_legendary")
-
-    @discord.ui.button(label="Mythical", style=discord.ButtonStyle.secondary, emoji=get_shard_emoji("primal_mythical"))
-    async def mythical(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self.ask_amount(interaction, "primal_mythical")
-
-    @discord.ui.button(label="Both", style=discord.ButtonStyle.success)
-    async def both(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self.ask_amount(interaction, "both")
-
-    async def ask_amount(self, interaction: discord.Interaction, key: str):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
         if interaction.user.id != self.user_id:
             await interaction.response.send_message("❌ This isn't your selection.", ephemeral=True)
-            return
-        if key == "both":
-            keys = ["primal_legendary", "primal_mythical"]
-            label = "Primal Legendary and Mythical"
-        else:
-            keys = [key]
-            label = key.replace("primal_", "").title()
+            return False
+        return True
 
-        await interaction.response.send_message(
-            f"{interaction.user.mention}, please enter the amount of {label} shards you opened (1-{MAX_AMOUNT_PER_COMMAND}):"
-        )
+    async def ask_amount(self, interaction: discord.Interaction, keys, label: str):
+        """Open the amount modal for the shard keys, described to the user by label"""
+        await interaction.response.send_modal(AmountModal(self.user_key, keys, label))
 
-        def check(m):
-            return (
-                m.author.id == interaction.user.id
-                and m.channel == interaction.channel
-                and m.content.isdigit()
-            )
+OPEN_SHARD_OPTIONS = tuple(
+    discord.SelectOption(label=SHARD_DISPLAY[key][1], value=key, emoji=SHARD_DISPLAY[key][0])
+    for key in ("ancient", "void", "sacred", "primal", "remnant")
+)
 
-        try:
-            msg = await bot.wait_for("message", check=check, timeout=30)
-            amount = int(msg.content)
-            if not validate_amount(amount):
-                await interaction.followup.send(
-                    f"❌ Invalid amount. Must be between 1 and {MAX_AMOUNT_PER_COMMAND}.", ephemeral=True
-                )
-                return
-
-            user_id_str = str(self.user_id)
-            if user_id_str not in user_data:
-                user_data[user_id_str] = {}
-
-            result_lines = []
-            for k in keys:
-                update_tracker(user_data[user_id_str], k, amount)
-                new_total = user_data[user_id_str][k]
-                label = k.replace("primal_", "").title()
-                emoji = get_shard_emoji(k)
-                result_lines.append(f"{emoji} {label}: +{amount} (Total: {new_total})")
-
-            save_data(user_data)
+class ShardSelectFirstView(ShardPickerView):
+    def __init__(self, user_id: int):
+        super().__init__(user_id)
+        self.select = discord.ui.Select(
+            placeholder="Select shard type...",
+            options=list(OPEN_SHARD_OPTIONS)
+        )
+        self.select.callback = self.select_callback
+        self.add_item(self.select)
 
-            embed = discord.Embed(
-                title="✅ Shard Update Complete",
-                description="\n".join(result_lines),
-                color=0x00ff00,
-                timestamp=datetime.utcnow()
+    async def select_callback(self, interaction: discord.Interaction):
+        await self.on_pick(interaction, self.select.values[0])
+
+    async def on_pick(self, interaction: discord.Interaction, key: str):
+        if key == "primal":
+            await interaction.response.edit_message(
+                content="Choose an option for Primal shard:", view=PrimalRarityAmountView(self.user_id)
             )
-            embed.set_footer(text=f"User: {interaction.user.display_name}")
+            return
+        await self.ask_amount(interaction, (key,), SHARD_DISPLAY[key][1])
+
+class PrimalRarityAmountView(ShardPickerView):
+    # (label, key, style) of each button
+    SHARD_BUTTONS = (
+        ("Legendary", "primal_legendary", discord.ButtonStyle.secondary),
+        ("Mythical", "primal_mythical", discord.ButtonStyle.secondary),
+        ("Both", "both", discord.ButtonStyle.success),
+    )
 
-            await interaction.followup.send(embed=embed, ephemeral=True)
-        except Exception:
-            await interaction.followup.send("❌ No valid amount received. Please try again.", ephemeral=True)
+    def __init__(self, user_id: int):
+        super().__init__(user_id)
+        for label, key, style in self.SHARD_BUTTONS:
+            emoji = SHARD_DISPLAY[key][0] if key in SHARD_DISPLAY else None
+            button = discord.ui.Button(label=label, style=style, emoji=emoji)
+            button.callback = partial(self.on_pick, key=key)
+            self.add_item(button)
+
+    async def on_pick(self, interaction: discord.Interaction, key: str):
+        if key == "both":
+            await self.ask_amount(interaction, ("primal_legendary", "primal_mythical"), "Primal Legendary and Mythical")
+        else:
+            await self.ask_amount(interaction, (key,), SHARD_DISPLAY[key][1])
 
 # ----------- RESET SHARD FLOW -----------
 
-def build_current_data_embed(title, desc, user_data, user_id, shard_type=None):
+# user_id -> (repo version, "Current Data" text) for the reset-all confirmation
+_current_data_cache = {}
+
+def build_current_data_embed(title, desc, repo, user_id, shard_type=None):
     embed = discord.Embed(title=title, description=desc, color=0xff6600)
+    udata = repo.get(user_id)
     if shard_type == "primal":
-        primal = user_data[user_id]
         embed.add_field(
             name="Current Data",
-            value=f"Legendary: {primal.get('primal_legendary', 0)}\nMythical: {primal.get('primal_mythical', 0)}",
+            value=f"Legendary: {udata.get('primal_legendary', 0)}\nMythical: {udata.get('primal_mythical', 0)}",
             inline=False
         )
     elif shard_type:
-        emoji = get_shard_emoji(shard_type)
-        count = user_data[user_id].get(shard_type, 0)
+        count = udata.get(shard_type, 0)
         embed.add_field(
             name="Current Data",
-            value=f"{emoji} {shard_type.title()}: {count}",
+            value=f"{SHARD_DISPLAY[shard_type][0]} {SHARD_TITLES[shard_type]}: {count}",
+            inline=False
+        )
+    elif udata:
+        # Rebuild the listing only when the user's data changed since it was cached
+        version = repo.version(user_id)
+        cached = _current_data_cache.get(user_id)
+        if cached is None or cached[0] != version:
+            cached = (version, "\n".join(f"{SHARD_TITLES.get(shard, shard)}: {count}" for shard, count in udata.items()))
+            _current_data_cache[user_id] = cached
+        embed.add_field(
+            name="Current Data",
+            value=cached[1],
             inline=False
         )
-    else:
-        current_data = [f"{shard.replace('_', ' ').title()}: {count}" for shard, count in user_data[user_id].items()]
-        if current_data:
-            embed.add_field(
-                name="Current Data",
-                value="\n".join(current_data),
-                inline=False
-            )
     return embed
 
+def _reset_keys(shard_type):
+    """Counter keys cleared by a reset menu choice; "primal" covers both rarities"""
+    if shard_type == "primal":
+        return ("primal_legendary", "primal_mythical")
+    return (shard_type,)
+
+def _has_counts(user_id, shard_type):
+    """Whether any counter the reset choice would clear is above zero"""
+    udata = bot.repo.get(user_id)
+    return any(udata.get(key, 0) for key in _reset_keys(shard_type))
+
+NOTHING_TO_RESET_EMBED = discord.Embed(
+    title="ℹ️ Nothing to Reset",
+    description="That counter is already at 0.",
+    color=0x808080
+)
+
 class ResetConfirmView(discord.ui.View):
-    def __init__(self, user_id, user_data, shard_type=None):
+    def __init__(self, user_id, shard_type=None):
         super().__init__(timeout=60.0)
         self.user_id = user_id
-        self.user_data = user_data
         self.shard_type = shard_type
 
     @discord.ui.button(label="✅ Confirm Reset", style=discord.ButtonStyle.danger)
@@ -290,18 +325,22 @@ class ResetConfirmView(discord.ui.View):
         if str(interaction.user.id) != self.user_id:
             await interaction.response.send_message("❌ You can only reset your own data.", ephemeral=True)
             return
+        repo = bot.repo
         if self.shard_type == "primal":
-            self.user_data[self.user_id]["primal_legendary"] = 0
-            self.user_data[self.user_id]["primal_mythical"] = 0
             desc = "Both Primal Legendary and Mythical have been reset."
         elif self.shard_type:
-            old_count = self.user_data[self.user_id].get(self.shard_type, 0)
-            self.user_data[self.user_id][self.shard_type] = 0
-            desc = f"Your **{self.shard_type.title()}** shard data has been reset.\nPrevious count: **{old_count}**"
+            old_count = repo.get(self.user_id).get(self.shard_type, 0)
+            desc = f"Your **{SHARD_TITLES[self.shard_type]}** shard data has been reset.\nPrevious count: **{old_count}**"
         else:
-            self.user_data[self.user_id] = {}
             desc = "All your mercy tracker data has been successfully reset."
-        save_data(self.user_data)
+        # Counters that are already zero are left alone, so no save is triggered
+        if self.shard_type:
+            if _has_counts(self.user_id, self.shard_type):
+                repo.reset(self.user_id, *_reset_keys(self.shard_type))
+        elif repo.get(self.user_id):
+            repo.reset(self.user_id)
+            # Wiping everything is persisted right away rather than on the next flush
+            await repo.flush_async()
         for item in self.children:
             item.disabled = True
         embed = discord.Embed(
@@ -325,18 +364,29 @@ class ResetConfirmView(discord.ui.View):
         )
         await interaction.response.edit_message(embed=embed, view=self)
 
+# Menu options are fixed, so they are built once; each Select gets its own list copy
+PRIMAL_RESET_OPTIONS = (
+    discord.SelectOption(label="Legendary", value="primal_legendary", emoji=SHARD_DISPLAY["primal_legendary"][0]),
+    discord.SelectOption(label="Mythical", value="primal_mythical", emoji=SHARD_DISPLAY["primal_mythical"][0]),
+    discord.SelectOption(label="Both", value="primal", emoji="🔄"),
+)
+
+SHARD_RESET_OPTIONS = (
+    discord.SelectOption(label="Reset All", value="reset_all", emoji="🗑️"),
+    discord.SelectOption(label="Ancient", value="ancient", emoji=SHARD_DISPLAY["ancient"][0]),
+    discord.SelectOption(label="Void", value="void", emoji=SHARD_DISPLAY["void"][0]),
+    discord.SelectOption(label="Sacred", value="sacred", emoji=SHARD_DISPLAY["sacred"][0]),
+    discord.SelectOption(label="Primal", value="primal", emoji=SHARD_DISPLAY["primal"][0]),
+    discord.SelectOption(label="Remnant", value="remnant", emoji=SHARD_DISPLAY["remnant"][0]),
+)
+
 class PrimalResetSelect(discord.ui.View):
-    def __init__(self, user_id, user_data):
+    def __init__(self, user_id):
         super().__init__(timeout=60)
         self.user_id = user_id
-        self.user_data = user_data
         self.select = discord.ui.Select(
             placeholder="Select Primal counter to reset...",
-            options=[
-                discord.SelectOption(label="Legendary", value="primal_legendary", emoji=get_shard_emoji("primal_legendary")),
-                discord.SelectOption(label="Mythical", value="primal_mythical", emoji=get_shard_emoji("primal_mythical")),
-                discord.SelectOption(label="Both", value="primal", emoji="🔄"),
-            ]
+            options=list(PRIMAL_RESET_OPTIONS)
         )
         self.select.callback = self.select_callback
         self.add_item(self.select)
@@ -346,29 +396,24 @@ class PrimalResetSelect(discord.ui.View):
             await interaction.response.send_message("❌ This menu isn't for you.", ephemeral=True)
             return
         shard_type = self.select.values[0]
+        if not _has_counts(self.user_id, shard_type):
+            await interaction.response.edit_message(embed=NOTHING_TO_RESET_EMBED, view=None)
+            return
         embed = build_current_data_embed(
             "⚠️ Confirm Primal Reset",
             "Are you sure you want to reset the selected Primal counter(s)?",
-            self.user_data, self.user_id, shard_type if shard_type != "primal" else "primal"
+            bot.repo, self.user_id, shard_type
         )
-        view = ResetConfirmView(self.user_id, self.user_data, shard_type)
+        view = ResetConfirmView(self.user_id, shard_type)
         await interaction.response.edit_message(embed=embed, view=view)
 
 class ShardResetSelect(discord.ui.View):
-    def __init__(self, user_id, user_data):
+    def __init__(self, user_id):
         super().__init__(timeout=60)
         self.user_id = user_id
-        self.user_data = user_data
         self.select = discord.ui.Select(
             placeholder="Select what to reset...",
-            options=[
-                discord.SelectOption(label="Reset All", value="reset_all", emoji="🗑️"),
-                discord.SelectOption(label="Ancient", value="ancient", emoji=get_shard_emoji("ancient")),
-                discord.SelectOption(label="Void", value="void", emoji=get_shard_emoji("void")),
-                discord.SelectOption(label="Sacred", value="sacred", emoji=get_shard_emoji("sacred")),
-                discord.SelectOption(label="Primal", value="primal", emoji=get_shard_emoji("primal")),
-                discord.SelectOption(label="Remnant", value="remnant", emoji=get_shard_emoji("remnant")),
-            ]
+            options=list(SHARD_RESET_OPTIONS)
         )
         self.select.callback = self.select_callback
         self.add_item(self.select)
@@ -382,25 +427,28 @@ class ShardResetSelect(discord.ui.View):
             embed = build_current_data_embed(
                 "⚠️ Confirm Complete Reset",
                 "Are you sure you want to reset **ALL** your mercy tracker data? This action cannot be undone.",
-                self.user_data, self.user_id
+                bot.repo, self.user_id
             )
-            view = ResetConfirmView(self.user_id, self.user_data, None)
+            view = ResetConfirmView(self.user_id, None)
             await interaction.response.edit_message(embed=embed, view=view)
         elif shard_type == "primal":
             embed = build_current_data_embed(
                 "Primal Reset",
                 "Choose which Primal counter to reset:",
-                self.user_data, self.user_id, "primal"
+                bot.repo, self.user_id, "primal"
             )
-            view = PrimalResetSelect(self.user_id, self.user_data)
+            view = PrimalResetSelect(self.user_id)
             await interaction.response.edit_message(embed=embed, view=view)
+        elif not _has_counts(self.user_id, shard_type):
+            await interaction.response.edit_message(embed=NOTHING_TO_RESET_EMBED, view=None)
         else:
+            emoji, label = SHARD_DISPLAY[shard_type]
             embed = build_current_data_embed(
                 "⚠️ Confirm Individual Reset",
-                f"Are you sure you want to reset your {get_shard_emoji(shard_type)} **{shard_type.title()}** shard data? This action cannot be undone.",
-                self.user_data, self.user_id, shard_type
+                f"Are you sure you want to reset your {emoji} **{label}** shard data? This action cannot be undone.",
+                bot.repo, self.user_id, shard_type
             )
-            view = ResetConfirmView(self.user_id, self.user_data, shard_type)
+            view = ResetConfirmView(self.user_id, shard_type)
             await interaction.response.edit_message(embed=embed, view=view)
 
 @tree.command(name="reset", description="Reset your mercy tracker data")
@@ -408,7 +456,7 @@ async def reset(interaction: discord.Interaction):
     """Reset user's mercy tracker data with menu selection"""
     try:
         user_id = str(interaction.user.id)
-        if user_id not in user_data or not user_data[user_id]:
+        if not bot.repo.get(user_id):
             await interaction.response.send_message("❌ No data to reset.", ephemeral=True)
             return
 
@@ -417,19 +465,23 @@ async def reset(interaction: discord.Interaction):
             description="Select what you want to reset.",
             color=0xff6600
         )
-        view = ShardResetSelect(user_id, user_data)
+        view = ShardResetSelect(user_id)
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
     except Exception as e:
-        logger.error(f"Error in reset command: {e}")
+        logger.error("Error in reset command: %s", e)
         await interaction.response.send_message("❌ An error occurred while processing reset request.", ephemeral=True)
 
 # ----------- STATUS COMMAND -----------
 
+# user_id -> (repo version, status report) of the last /status for that user
+_status_cache = {}
+
 @tree.command(name="status", description="Check your current mercy tracker status")
 async def status(interaction: discord.Interaction):
     try:
         user_id = str(interaction.user.id)
-        if user_id not in user_data or not user_data[user_id]:
+        udata = bot.repo.get(user_id)
+        if not udata:
             embed = discord.Embed(
                 title="📊 Mercy Tracker Status",
                 description="No data found. Use `/open` to start tracking your summons!",
@@ -438,112 +490,117 @@ async def status(interaction: discord.Interaction):
             await interaction.response.send_message(embed=embed)
             return
 
-        status_report = get_status(user_data[user_id])
+        # Reuse the last report for this user unless their data has changed since
+        version = bot.repo.version(user_id)
+        cached = _status_cache.get(user_id)
+        if cached is not None and cached[0] == version:
+            status_report = cached[1]
+        else:
+            status_report = get_status(udata)
+            _status_cache[user_id] = (version, status_report)
 
         embed = discord.Embed(
             title="📊 Mercy Tracker Status",
             description=status_report,
             color=0x0099ff,
-            timestamp=datetime.utcnow()
+            timestamp=datetime.now(timezone.utc)
         )
         embed.set_footer(text=f"User: {interaction.user.display_name}")
 
         await interaction.response.send_message(embed=embed)
-        logger.info(f"User {interaction.user.id} checked status")
+        logger.info("User %s checked status", interaction.user.id)
 
     except Exception as e:
-        logger.error(f"Error in status command: {e}")
+        logger.error("Error in status command: %s", e)
         await interaction.response.send_message("❌ An error occurred while retrieving your status.", ephemeral=True)
 
 # ----------- HELP, MERCY_INFO and other commands -----------
+def _build_mercy_info_embed():
+    """Build the /mercy_info embed"""
+    embed = discord.Embed(
+        title="🎯 Mercy System Rules",
+        description="Here are the mercy thresholds for each shard type:",
+        color=0x9932cc
+    )
+    
+    embed.add_field(
+        name="How it works",
+        value="• Mercy activates after a certain number of summons without getting the target rarity\n• Once activated, your chance increases with each additional summon\n• Mercy resets when you pull the target rarity",
+        inline=False
+    )
+    
+    embed.add_field(name="Mercy Rules", value=get_mercy_rules_info(), inline=False)
+    return embed
+
+def _build_help_embed():
+    """Build the /help embed"""
+    embed = discord.Embed(
+        title="🤖 Mercy Tracker Bot Help",
+        description="Track your Raid: Shadow Legends mercy progress with ease!",
+        color=0x00ff99
+    )
+    
+    # Commands section
+    commands_info = [
+        "**`/open`** - Log opened shards",
+        "**`/status`** - View your mercy progress",
+        "**`/reset`** - Reset data (all or specific shard type)",
+        "**`/mercy_info`** - View mercy system rules",
+        "**`/help`** - Show this help message"
+    ]
+    
+    embed.add_field(
+        name="📋 Commands",
+        value="\n".join(commands_info),
+        inline=False
+    )
+    
+    # Shard types section
+    shard_info = [
+        "**Ancient** - Legendary mercy at 200 summons",
+        "**Void** - Legendary mercy at 200 summons",
+        "**Sacred** - Legendary mercy at 12 summons",
+        "**Primal** - Legendary mercy at 75, Mythical at 200",
+        "**Remnant** - Mythical mercy at 24 summons"
+    ]
+    
+    embed.add_field(
+        name="🔮 Supported Shard Types",
+        value="\n".join(shard_info),
+        inline=False
+    )
+    
+    # Tips section
+    tips = [
+        "• Your data is automatically saved and backed up",
+        "• Use `/mercy_info` to see detailed mercy rules",
+        "• Maximum 500 shards can be logged per command",
+        "• Use `/reset` to prompt for a reset menu",
+        "• All commands work only for you (your data is private)"
+    ]
+    
+    embed.add_field(
+        name="💡 Tips",
+        value="\n".join(tips),
+        inline=False
+    )
+    
+    embed.set_footer(text="Happy summoning! 🌟")
+    return embed
+
+# Both embeds are static, so they are built once and reused for every call
+_MERCY_INFO_EMBED = _build_mercy_info_embed()
+_HELP_EMBED = _build_help_embed()
+
 @tree.command(name="mercy_info", description="View mercy system rules and thresholds")
 async def mercy_info(interaction: discord.Interaction):
     """Display mercy system information"""
-    try:
-        info = get_mercy_rules_info()
-        
-        embed = discord.Embed(
-            title="🎯 Mercy System Rules",
-            description="Here are the mercy thresholds for each shard type:",
-            color=0x9932cc
-        )
-        
-        embed.add_field(
-            name="How it works",
-            value="• Mercy activates after a certain number of summons without getting the target rarity\n• Once activated, your chance increases with each additional summon\n• Mercy resets when you pull the target rarity",
-            inline=False
-        )
-        
-        embed.add_field(name="Mercy Rules", value=info, inline=False)
-        
-        await interaction.response.send_message(embed=embed)
-        
-    except Exception as e:
-        logger.error(f"Error in mercy_info command: {e}")
-        await interaction.response.send_message("❌ An error occurred while retrieving mercy information.", ephemeral=True)
+    await interaction.response.send_message(embed=_MERCY_INFO_EMBED)
 
 @tree.command(name="help", description="Show detailed help for all commands")
 async def help_command(interaction: discord.Interaction):
     """Display comprehensive help information"""
-    try:
-        embed = discord.Embed(
-            title="🤖 Mercy Tracker Bot Help",
-            description="Track your Raid: Shadow Legends mercy progress with ease!",
-            color=0x00ff99
-        )
-        
-        # Commands section
-        commands_info = [
-            "**`/open`** - Log opened shards",
-            "**`/status`** - View your mercy progress",
-            "**`/reset`** - Reset data (all or specific shard type)",
-            "**`/mercy_info`** - View mercy system rules",
-            "**`/help`** - Show this help message"
-        ]
-        
-        embed.add_field(
-            name="📋 Commands",
-            value="\n".join(commands_info),
-            inline=False
-        )
-        
-        # Shard types section
-        shard_info = [
-            "**Ancient** - Legendary mercy at 200 summons",
-            "**Void** - Legendary mercy at 200 summons",
-            "**Sacred** - Legendary mercy at 12 summons",
-            "**Primal** - Legendary mercy at 75, Mythical at 200",
-            "**Remnant** - Mythical mercy at 24 summons"
-        ]
-        
-        embed.add_field(
-            name="🔮 Supported Shard Types",
-            value="\n".join(shard_info),
-            inline=False
-        )
-        
-        # Tips section
-        tips = [
-            "• Your data is automatically saved and backed up",
-            "• Use `/mercy_info` to see detailed mercy rules",
-            "• Maximum 500 shards can be logged per command",
-            "• Use `/reset` to prompt for a reset menu",
-            "• All commands work only for you (your data is private)"
-        ]
-        
-        embed.add_field(
-            name="💡 Tips",
-            value="\n".join(tips),
-            inline=False
-        )
-        
-        embed.set_footer(text="Happy summoning! 🌟")
-        
-        await interaction.response.send_message(embed=embed)
-        
-    except Exception as e:
-        logger.error(f"Error in help command: {e}")
-        await interaction.response.send_message("❌ An error occurred while displaying help.", ephemeral=True)
+    await interaction.response.send_message(embed=_HELP_EMBED)
 
 # ----------- HEALTH CHECK COMMAND -----------#
 @tree.command(name="health", description="Check if the bot is running")
@@ -563,5 +620,14 @@ if __name__ == "__main__":
     try:
         bot.run(bot_token)
     except Exception as e:
-        logger.error(f"Failed to start bot: {e}")
-        print(f"Failed to start bot: {e}")
\ No newline at end of file
+        logger.error("Failed to start bot: %s", e)
+        print(f"Failed to start bot: {e}")
+    finally:
+        # If the bot stopped before loading, there is nothing to save or back up
+        if bot.repo.loaded:
+            try:
+                bot.repo.flush()
+            except Exception:
+                # save already logged the error; the backup below still captures the changes
+                logger.error("Could not save pending changes on shutdown, backing them up instead")
+            backup_data(bot.repo.backup_payload())
\ No newline at end of file
@@ -1,7 +1,7 @@
 """Configuration settings for the Mercy Tracker Bot"""
 
 # Valid shard types supported by the bot
-VALID_SHARD_TYPES = ["ancient", "void", "sacred", "primal", "primal_legendary", "primal_mythical", "remnant"]
+VALID_SHARD_TYPES = frozenset({"ancient", "void", "sacred", "primal", "primal_legendary", "primal_mythical", "remnant"})
 
 # Maximum amount that can be added in a single command
 MAX_AMOUNT_PER_COMMAND = 500
@@ -14,6 +14,12 @@ DATA_FILE = "user_data.json"
 BACKUP_FOLDER = "backups"
 MAX_BACKUPS = 10
 
+# Seconds between flushes of pending user data changes to disk
+SAVE_INTERVAL_SECONDS = 5
+
+# Minutes between automatic backup snapshots
+BACKUP_INTERVAL_MINUTES = 10
+
 # Logging settings
 LOG_FILE = "bot.log"
 LOG_LEVEL = "INFO"
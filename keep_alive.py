@@ -1,16 +1,18 @@
 # keep_alive.py
-from flask import Flask
-from threading import Thread
+from aiohttp import web
 
-app = Flask('')
+async def home(request):
+    return web.Response(text="I'm thinking!")
 
-@app.route('/')
-def home():
-    return "I'm thinking!"
-
-def run():
-    app.run(host='0.0.0.0', port=8080)
-
-def keep_alive():
-    t = Thread(target=run)
-    t.start()
+async def keep_alive():
+    """Serve the uptime ping on port 8080 from the bot's own event loop"""
+    app = web.Application()
+    app.router.add_get('/', home)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, '0.0.0.0', 8080).start()
+    except OSError:
+        await runner.cleanup()
+        raise
+    return runner
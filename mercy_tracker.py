@@ -1,117 +1,134 @@
-from config import VALID_SHARD_TYPES
-from utils import format_progress_bar
+from typing import NamedTuple
+
+from utils import format_progress_bar_raw
+# Re-exported so mercy_tracker.validate_shard_type keeps working; utils has the only definition
+from utils import validate_shard_type
 
 def update_tracker(data, shard_type, amount):
     """Update the mercy tracker data for a specific shard type"""
-    if shard_type not in data:
-        data[shard_type] = 0
-    data[shard_type] += amount
+    data[shard_type] = data.get(shard_type, 0) + amount
+
+# Mercy thresholds per shard type and rarity; shared, so callers must not mutate it
+_MERCY_RULES = {
+    "ancient": {
+        "legendary": {"start": 200, "rate": 5}
+    },
+    "void": {
+        "legendary": {"start": 200, "rate": 5}
+    },
+    "sacred": {
+        "legendary": {"start": 12, "rate": 2}
+    },
+    "primal": {
+        "legendary": {"start": 75, "rate": 1},
+        "mythical": {"start": 200, "rate": 10}
+    },
+    "remnant": {
+        "mythical": {"start": 24, "rate": 1}
+    }
+}
+
+# _MERCY_RULES flattened to shard_type -> ((rarity, start, rate), ...) for the status loops
+_RULES_BY_SHARD = {
+    shard_type: tuple((rarity, rule["start"], rule["rate"]) for rarity, rule in rules.items())
+    for shard_type, rules in _MERCY_RULES.items()
+}
 
-def validate_shard_type(shard_type):
-    """Validate if the shard type is supported"""
-    return shard_type.lower() in VALID_SHARD_TYPES
+# Primal rarities are counted separately, so each gets a virtual shard entry of its own
+_PRIMAL_SHARDS = ("primal_legendary", "primal_mythical")
+_RULES_BY_SHARD.update(
+    (f"primal_{rule[0]}", (rule,)) for rule in _RULES_BY_SHARD["primal"]
+)
+
+# Display names of the shard types and rarities in _MERCY_RULES
+_SHARD_TITLE = {shard_type: shard_type.title() for shard_type in _MERCY_RULES}
+_RARITY_TITLE = {rarity: rarity.title() for rules in _MERCY_RULES.values() for rarity in rules}
 
 def get_mercy_rules():
     """Get the mercy rules dictionary"""
-    return {
-        "ancient": {
-            "legendary": {"start": 200, "rate": 5}
-        },
-        "void": {
-            "legendary": {"start": 200, "rate": 5}
-        },
-        "sacred": {
-            "legendary": {"start": 12, "rate": 2}
-        },
-        "primal": {
-            "legendary": {"start": 75, "rate": 1},
-            "mythical": {"start": 200, "rate": 10}
-        },
-        "remnant": {
-            "mythical": {"start": 24, "rate": 1}
-        }
-    }
+    return _MERCY_RULES
+
+class _RuleResult(NamedTuple):
+    """Mercy progress of one rarity of one shard type"""
+    shard_type: str
+    rarity: str
+    count: int
+    start: int
+    remaining: int
+    chance_increase: int
+    active: bool
+    progress: float
+
+def _iter_rule_results(data):
+    """Yield a _RuleResult per rule that applies to the user's shards
+
+    The Primal shards come first, both of them once either is non-zero, so that
+    they can be shown together under one header.
+    """
+    primal = [(shard_type, data.get(shard_type, 0)) for shard_type in _PRIMAL_SHARDS]
+    if not any(count > 0 for _, count in primal):
+        primal = []
+    shards = primal + [(shard_type, count) for shard_type, count in data.items() if shard_type not in _PRIMAL_SHARDS]
+
+    for shard_type, count in shards:
+        for rarity, start_mercy, rate_increase in _RULES_BY_SHARD.get(shard_type, ()):
+            if count < start_mercy:
+                yield _RuleResult(shard_type, rarity, count, start_mercy,
+                                  start_mercy - count, 0, False, count / start_mercy)
+            else:
+                yield _RuleResult(shard_type, rarity, count, start_mercy,
+                                  0, (count - start_mercy) * rate_increase, True, 1)
 
 def get_status(data):
     """Generate a formatted status report for the user's mercy progress"""
-    mercy_rules = get_mercy_rules()
-    lines = []
-
-    # Handle Primal output specially
-    primal_legendary = data.get("primal_legendary", 0)
-    primal_mythical = data.get("primal_mythical", 0)
-    if primal_legendary > 0 or primal_mythical > 0:
-        total_primal = max(primal_legendary, primal_mythical)
-        lines.append(f"\n**Primal Shards** ({total_primal} total)")
-        # Legendary
-        rule = mercy_rules["primal"]["legendary"]
-        start_mercy = rule["start"]
-        rate_increase = rule["rate"]
-        progress = primal_legendary / start_mercy if start_mercy else 0
-        progress_bar = format_progress_bar(progress, 10)
-        percent = int(progress * 100)
-        if primal_legendary < start_mercy:
-            remaining = start_mercy - primal_legendary
-            lines.append(f"└ Legendary: {remaining} to mercy {progress_bar} {percent}% ({primal_legendary}/{start_mercy})")
-        else:
-            extra = primal_legendary - start_mercy
-            chance_increase = extra * rate_increase
-            lines.append(f"└ Legendary: **MERCY ACTIVE** (+{chance_increase}% chance)")
-        # Mythical
-        rule = mercy_rules["primal"]["mythical"]
-        start_mercy = rule["start"]
-        rate_increase = rule["rate"]
-        progress = primal_mythical / start_mercy if start_mercy else 0
-        progress_bar = format_progress_bar(progress, 10)
-        percent = int(progress * 100)
-        if primal_mythical < start_mercy:
-            remaining = start_mercy - primal_mythical
-            lines.append(f"└ Mythical: {remaining} to mercy {progress_bar} {percent}% ({primal_mythical}/{start_mercy})")
+    # One list of lines per shard header, joined with blank lines between them
+    sections = []
+    last_shard = None
+
+    for result in _iter_rule_results(data):
+        shard_type = result.shard_type
+        if shard_type != last_shard:
+            last_shard = shard_type
+            # Both Primal rarities share one header, which always comes with the legendary line
+            if shard_type == "primal_legendary":
+                section = [f"**Primal Shards** ({max(result.count, data.get('primal_mythical', 0))} total)"]
+                sections.append(section)
+            elif shard_type != "primal_mythical":
+                section = [f"**{_SHARD_TITLE[shard_type]} Shards** ({result.count} total)"]
+                sections.append(section)
+        rarity_title = _RARITY_TITLE[result.rarity]
+        if result.active:
+            section.append(f"└ {rarity_title}: **MERCY ACTIVE** (+{result.chance_increase}% chance)")
         else:
-            extra = primal_mythical - start_mercy
-            chance_increase = extra * rate_increase
-            lines.append(f"└ Mythical: **MERCY ACTIVE** (+{chance_increase}% chance)")
+            progress_bar = format_progress_bar_raw(result.progress, 10)
+            section.append(
+                f"└ {rarity_title}: {result.remaining} to mercy {progress_bar} "
+                f"{int(result.progress * 100)}% ({result.count}/{result.start})"
+            )
 
-    # Show all other shards
-    for shard_type, count in data.items():
-        if shard_type in ("primal_legendary", "primal_mythical"):
-            continue
-        if shard_type not in mercy_rules:
-            continue
-        lines.append(f"\n**{shard_type.title()} Shards** ({count} total)")
-        for rarity, rule in mercy_rules[shard_type].items():
-            start_mercy = rule["start"]
-            rate_increase = rule["rate"]
-            progress = count / start_mercy if start_mercy else 0
-            progress_bar = format_progress_bar(progress, 10)
-            percent = int(progress * 100)
-            if count < start_mercy:
-                remaining = start_mercy - count
-                lines.append(f"└ {rarity.title()}: {remaining} to mercy {progress_bar} {percent}% ({count}/{start_mercy})")
-            else:
-                extra = count - start_mercy
-                chance_increase = extra * rate_increase
-                lines.append(f"└ {rarity.title()}: **MERCY ACTIVE** (+{chance_increase}% chance)")
-
-    if not lines:
+    if not sections:
         return "No mercy data tracked yet. Use `/open` to start tracking!"
 
-    return "\n".join(lines)
+    return "\n\n".join("\n".join(section) for section in sections)
 
-def get_mercy_rules_info():
-    """Get formatted mercy rules information"""
-    mercy_rules = get_mercy_rules()
+def _build_mercy_rules_info():
+    """Format the mercy rules for display"""
     info_lines = []
     
-    for shard_type, rules in mercy_rules.items():
-        info_lines.append(f"\n**{shard_type.title()} Shards:**")
-        for rarity, rule in rules.items():
-            start = rule["start"]
-            rate = rule["rate"]
-            info_lines.append(f"└ {rarity.title()}: Mercy at {start} summons (+{rate}% per summon after)")
+    for shard_type in _MERCY_RULES:
+        info_lines.append(f"\n**{_SHARD_TITLE[shard_type]} Shards:**")
+        for rarity, start, rate in _RULES_BY_SHARD[shard_type]:
+            info_lines.append(f"└ {_RARITY_TITLE[rarity]}: Mercy at {start} summons (+{rate}% per summon after)")
     
     return "\n".join(info_lines)
 
+# The rules never change, so their description is formatted once
+_MERCY_RULES_INFO = _build_mercy_rules_info()
+
+def get_mercy_rules_info():
+    """Get formatted mercy rules information"""
+    return _MERCY_RULES_INFO
+
 def calculate_mercy_chance(current_count, mercy_start, rate_per_summon):
     """Calculate the current mercy chance percentage"""
     if current_count < mercy_start:
@@ -122,97 +139,23 @@ def calculate_mercy_chance(current_count, mercy_start, rate_per_summon):
 
 def get_detailed_status(data):
     """Get detailed status with percentages and progress"""
-    mercy_rules = get_mercy_rules()
     detailed_info = {}
 
-    # Handle Primal Legendary
-    primal_legendary = data.get("primal_legendary", 0)
-    if primal_legendary > 0:
-        rule = mercy_rules["primal"]["legendary"]
-        start_mercy = rule["start"]
-        rate_increase = rule["rate"]
-        if primal_legendary < start_mercy:
-            remaining = start_mercy - primal_legendary
-            progress_percent = (primal_legendary / start_mercy) * 100
-            chance_increase = 0
-            active = False
-        else:
-            remaining = 0
-            progress_percent = 100
-            chance_increase = (primal_legendary - start_mercy) * rate_increase
-            active = True
-        detailed_info["primal_legendary"] = {
-            "count": primal_legendary,
-            "mercy_status": {
-                "legendary": {
-                    "active": active,
-                    "remaining": remaining,
-                    "progress_percent": progress_percent,
-                    "chance_increase": chance_increase
-                }
-            }
-        }
-
-    # Handle Primal Mythical
-    primal_mythical = data.get("primal_mythical", 0)
-    if primal_mythical > 0:
-        rule = mercy_rules["primal"]["mythical"]
-        start_mercy = rule["start"]
-        rate_increase = rule["rate"]
-        if primal_mythical < start_mercy:
-            remaining = start_mercy - primal_mythical
-            progress_percent = (primal_mythical / start_mercy) * 100
-            chance_increase = 0
-            active = False
-        else:
-            remaining = 0
-            progress_percent = 100
-            chance_increase = (primal_mythical - start_mercy) * rate_increase
-            active = True
-        detailed_info["primal_mythical"] = {
-            "count": primal_mythical,
-            "mercy_status": {
-                "mythical": {
-                    "active": active,
-                    "remaining": remaining,
-                    "progress_percent": progress_percent,
-                    "chance_increase": chance_increase
-                }
-            }
-        }
-
-    # Handle all other shards
-    for shard_type, count in data.items():
-        if shard_type in ("primal_legendary", "primal_mythical"):
-            continue
-        if shard_type not in mercy_rules:
+    for result in _iter_rule_results(data):
+        # Primal rarities are only listed once they have been counted
+        if not result.count and result.shard_type in _PRIMAL_SHARDS:
             continue
-
-        detailed_info[shard_type] = {
-            "count": count,
-            "mercy_status": {}
-        }
-
-        for rarity, rule in mercy_rules[shard_type].items():
-            start_mercy = rule["start"]
-            rate_increase = rule["rate"]
-
-            if count < start_mercy:
-                remaining = start_mercy - count
-                progress_percent = (count / start_mercy) * 100
-                chance_increase = 0
-                active = False
-            else:
-                remaining = 0
-                progress_percent = 100
-                chance_increase = (count - start_mercy) * rate_increase
-                active = True
-
-            detailed_info[shard_type]["mercy_status"][rarity] = {
-                "active": active,
-                "remaining": remaining,
-                "progress_percent": progress_percent,
-                "chance_increase": chance_increase
+        shard_info = detailed_info.get(result.shard_type)
+        if shard_info is None:
+            shard_info = detailed_info[result.shard_type] = {
+                "count": result.count,
+                "mercy_status": {}
             }
+        shard_info["mercy_status"][result.rarity] = {
+            "active": result.active,
+            "remaining": result.remaining,
+            "progress_percent": result.progress * 100,
+            "chance_increase": result.chance_increase
+        }
 
     return detailed_info
\ No newline at end of file
@@ -0,0 +1,170 @@
+"""User data storage for the Mercy Tracker Bot"""
+
+import asyncio
+import json
+import logging
+from typing import Protocol
+
+from backup_manager import restore_data
+from utils import dumps_json, loads_json, write_atomic
+
+logger = logging.getLogger(__name__)
+
+class MercyRepo(Protocol):
+    """Per-user shard counters, as read and changed by the command handlers"""
+
+    # Set once load() has read the stored data
+    loaded: bool
+
+    def load(self) -> None:
+        """Read the stored data; blocking, so the bot runs it in a worker thread"""
+        ...
+
+    def get(self, user_id: str) -> dict:
+        """Return the user's shard counts (empty if none); callers must not mutate it"""
+        ...
+
+    def add(self, user_id: str, shard_type: str, amount: int) -> int:
+        """Add amount to a shard counter and return the new total"""
+        ...
+
+    def reset(self, user_id: str, *shard_types: str) -> None:
+        """Zero the given shard counters, or clear all of the user's data if none are given"""
+        ...
+
+    def version(self, user_id: str) -> int:
+        """Return a number that changes whenever the user's data changes"""
+        ...
+
+    async def flush_async(self) -> None:
+        """Persist pending changes without blocking the event loop"""
+        ...
+
+    def flush(self) -> None:
+        """Persist pending changes now, blocking; raises if the write fails"""
+        ...
+
+    def backup_payload(self) -> "dict | bytes":
+        """Data to hand to backup_data: a dict, or JSON bytes that are already encoded"""
+        ...
+
+class JsonMercyRepo:
+    """MercyRepo held in memory and saved to a single JSON file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._data = {}
+        # Per-user change counters; users never changed since loading are at 0
+        self._versions = {}
+        # Set once load() has read the data file
+        self.loaded = False
+        # Set when there are changes that haven't been written to disk yet
+        self._dirty = False
+        # Set while a save is running in a worker thread
+        self._saving = False
+        # Held for the duration of flush_async, so saves never overlap; created on
+        # first use, inside the running event loop
+        self._save_lock = None
+        # Bytes of the last successful save, so identical snapshots aren't rewritten
+        self._saved_payload = None
+
+    def load(self):
+        self._data = self._read()
+        self.loaded = True
+
+    def _read(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = loads_json(f.read())
+                logger.info("Loaded data for %d users", len(data))
+                return data
+        except FileNotFoundError:
+            logger.info("No existing data file found, starting with empty data")
+            return {}
+        except json.JSONDecodeError as e:
+            logger.error("Error decoding JSON data: %s", e)
+            backup_data_restored = restore_data()
+            if backup_data_restored:
+                logger.info("Restored data from backup")
+                return backup_data_restored
+            return {}
+        except Exception as e:
+            logger.error("Unexpected error loading data: %s", e)
+            return {}
+
+    def get(self, user_id):
+        return self._data.get(user_id, {})
+
+    def add(self, user_id, shard_type, amount):
+        udata = self._data.setdefault(user_id, {})
+        # Same as update_tracker, but hands back the new total without a second lookup
+        total = udata[shard_type] = udata.get(shard_type, 0) + amount
+        self._bump(user_id)
+        return total
+
+    def reset(self, user_id, *shard_types):
+        if shard_types:
+            udata = self._data.setdefault(user_id, {})
+            for shard_type in shard_types:
+                udata[shard_type] = 0
+        else:
+            self._data[user_id] = {}
+        self._bump(user_id)
+
+    def version(self, user_id):
+        return self._versions.get(user_id, 0)
+
+    def _bump(self, user_id):
+        """Record a change to the user's data"""
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        self._dirty = True
+
+    def snapshot(self):
+        """Copy the data so it can be serialized off the event loop while handlers mutate it"""
+        return {user_id: dict(shards) for user_id, shards in self._data.items()}
+
+    async def flush_async(self):
+        # The snapshot is taken on the event loop, where handlers change the data;
+        # only encoding and writing it happen in the worker thread
+        if self._save_lock is None:
+            self._save_lock = asyncio.Lock()
+        async with self._save_lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            self._saving = True
+            try:
+                await asyncio.to_thread(self.save, self.snapshot())
+            except Exception:
+                # save already logged it; keep the changes pending and retry
+                self._dirty = True
+            finally:
+                self._saving = False
+
+    def flush(self):
+        if self._dirty:
+            self._dirty = False
+            try:
+                self.save(self.snapshot())
+            except Exception:
+                self._dirty = True
+                raise
+
+    def backup_payload(self):
+        # The last saved JSON bytes are reused while they still match the data
+        if self._dirty or self._saving or self._saved_payload is None:
+            return self.snapshot()
+        return self._saved_payload
+
+    def save(self, data):
+        """Write a snapshot to the data file, unless it matches what was last saved"""
+        try:
+            payload = dumps_json(data)
+            if payload == self._saved_payload:
+                return
+            write_atomic(self.path, payload)
+            self._saved_payload = payload
+            logger.info("Saved data for %d users", len(data))
+        except Exception as e:
+            logger.error("Error saving data: %s", e)
+            raise
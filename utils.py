@@ -1,5 +1,11 @@
 """Utility functions for the Mercy Tracker Bot"""
 
+import json
+import os
+import stat
+import tempfile
+from datetime import datetime, timezone
+
 from config import (
     MAX_AMOUNT_PER_COMMAND, 
     MIN_AMOUNT_PER_COMMAND,
@@ -9,29 +15,57 @@ from config import (
     VALID_SHARD_TYPES
 )
 
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; fall back to ujson, then to the stdlib encoder
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
 # Valida quantidade, entre 1 e MAX_AMOUNT_PER_COMMAND (500)
 def validate_amount(amount: int, max_amount: int = 500) -> bool:
     return 1 <= amount <= max_amount <= MAX_AMOUNT_PER_COMMAND
 
+# length -> every bar string of that length, indexed by the number of filled cells
+_BAR_CACHE = {}
+
+def _bars(length):
+    """Return the cached bar strings for length, building them on first use"""
+    bars = _BAR_CACHE.get(length)
+    if bars is None:
+        bars = tuple(
+            PROGRESS_FILLED_CHAR * filled + PROGRESS_EMPTY_CHAR * (length - filled)
+            for filled in range(length + 1)
+        )
+        _BAR_CACHE[length] = bars
+    return bars
+
+def _clamp_progress(progress):
+    """Ensure progress is between 0 and 1"""
+    if progress < 0:
+        return 0
+    if progress > 1:
+        return 1
+    return progress
+
 def format_progress_bar(progress, length=None):
     """Create a visual progress bar"""
+    progress = _clamp_progress(progress)
+    return f"{format_progress_bar_raw(progress, length)} {int(progress * 100)}%"
+
+def format_progress_bar_raw(progress, length=None):
+    """Create a visual progress bar without the percentage suffix"""
     if length is None:
         length = PROGRESS_BAR_LENGTH
-    
-    # Ensure progress is between 0 and 1
-    progress = max(0, min(1, progress))
-    
-    filled_length = int(length * progress)
-    empty_length = length - filled_length
-    
-    bar = PROGRESS_FILLED_CHAR * filled_length + PROGRESS_EMPTY_CHAR * empty_length
-    percentage = int(progress * 100)
-    
-    return f"{bar} {percentage}%"
+    return _bars(length)[int(length * _clamp_progress(progress))]
 
 def format_number_with_commas(number):
     """Format large numbers with commas for readability"""
-    return f"{number:,}"
+    return format(number, ",")
 
 def calculate_percentage(current, total):
     """Calculate percentage with safety check for division by zero"""
@@ -45,87 +79,94 @@ def truncate_text(text, max_length=100):
         return text
     return text[:max_length - 3] + "..."
 
+# Deletes the markdown characters that could break message formatting
+_MARKDOWN_STRIP_TABLE = str.maketrans("", "", "`*_")
+
 def sanitize_input(text):
     """Basic input sanitization"""
     if not isinstance(text, str):
         return str(text)
     
-    # Remove any potentially harmful characters
-    sanitized = text.strip()
-    # Remove any markdown that could break formatting
-    sanitized = sanitized.replace('`', '').replace('*', '').replace('_', '')
-    
-    return sanitized
+    # Remove surrounding whitespace and any markdown, in one pass each
+    return text.strip().translate(_MARKDOWN_STRIP_TABLE)
 
 def format_time_ago(timestamp):
     """Format timestamp to human readable 'time ago' format"""
-    from datetime import datetime, timezone
-    
-    now = datetime.now(timezone.utc)
-    diff = now - timestamp
-    
-    seconds = diff.total_seconds()
+    seconds = int((datetime.now(timezone.utc) - timestamp).total_seconds())
     
     if seconds < 60:
         return "just now"
     elif seconds < 3600:
-        minutes = int(seconds // 60)
-        return f"{minutes} minute{'s' if minutes != 1 else ''} ago"
+        minutes = seconds // 60
+        return "1 minute ago" if minutes == 1 else f"{minutes} minutes ago"
     elif seconds < 86400:
-        hours = int(seconds // 3600)
-        return f"{hours} hour{'s' if hours != 1 else ''} ago"
+        hours = seconds // 3600
+        return "1 hour ago" if hours == 1 else f"{hours} hours ago"
     else:
-        days = int(seconds // 86400)
-        return f"{days} day{'s' if days != 1 else ''} ago"
+        days = seconds // 86400
+        return "1 day ago" if days == 1 else f"{days} days ago"
 
 # Valida se o shard_type é válido (inclui os específicos como primal_legendary)
 def validate_shard_type(shard_type: str) -> bool:
-    # Permitimos também subtipos para primal legendário e mythical
-    if shard_type in VALID_SHARD_TYPES:
-        return True
-    if shard_type in ("primal_legendary", "primal_mythical"):
-        return True
-    return False
+    # Permitimos também subtipos para primal legendário e mythical (já incluídos em VALID_SHARD_TYPES)
+    # Case-sensitive: counters are stored under the key as given, so "Void" must not pass
+    return shard_type in VALID_SHARD_TYPES
+
+_RARITY_EMOJIS = {
+    "legendary": "🟡",
+    "mythical": "🔴",
+    "epic": "🟣",
+    "rare": "🔵",
+    "uncommon": "🟢",
+    "common": "⚪"
+}
+
+_SHARD_EMOJIS = {
+    "ancient": "<:ancientshard:1102264358886711439>",
+    "void": "<:voidshard:1102264251910987886>",
+    "sacred": "<:sacredshard:1102264154636701758>",
+    "primal": "<:primalshard:1165617400851476570>",
+    "primal_legendary": "<:goldstar:1400625240366911591>",
+    "primal_mythical": "<:redstar:1400625171542446230>",
+    "remnant": "<:remnant:1400625036645240842>"
+}
 
 def get_rarity_emoji(rarity):
     """Get emoji for different rarities"""
-    rarity_emojis = {
-        "legendary": "🟡",
-        "mythical": "🔴",
-        "epic": "🟣",
-        "rare": "🔵",
-        "uncommon": "🟢",
-        "common": "⚪"
-    }
-    return rarity_emojis.get(rarity.lower(), "⚫")
+    # Lowercase keys hit directly; anything else is lowercased first
+    emoji = _RARITY_EMOJIS.get(rarity)
+    if emoji is None:
+        emoji = _RARITY_EMOJIS.get(rarity.lower(), "⚫")
+    return emoji
 
 def get_shard_emoji(shard_type):
     """Get emoji for different shard types"""
-    shard_emojis = {
-        "ancient": "<:ancientshard:1102264358886711439>",
-        "void": "<:voidshard:1102264251910987886>",
-        "sacred": "<:sacredshard:1102264154636701758>",
-        "primal": "<:primalshard:1165617400851476570>",
-        "primal_legendary": "<:goldstar:1400625240366911591>",
-        "primal_mythical": "<:redstar:1400625171542446230>",
-        "remnant": "<:remnant:1400625036645240842>"
-    }
-    return shard_emojis.get(shard_type.lower(), "🔘")
+    emoji = _SHARD_EMOJIS.get(shard_type)
+    if emoji is None:
+        emoji = _SHARD_EMOJIS.get(shard_type.lower(), "🔘")
+    return emoji
 
 def format_shard_type(shard_type):
     """Format shard type with proper capitalization"""
     return shard_type.title()
 
+# Discord user IDs are 17-19 digits long
+_MIN_USER_ID = 10**16
+_MAX_USER_ID = 10**19
+
 def validate_user_id(user_id):
     """Validate Discord user ID format"""
-    if not isinstance(user_id, (str, int)):
+    if isinstance(user_id, int):
+        return _MIN_USER_ID <= user_id <= _MAX_USER_ID
+    if not isinstance(user_id, str):
         return False
     
+    # Fewer than 17 characters can't hold enough digits, so skip parsing
+    if len(user_id) < 17:
+        return False
     try:
-        user_id_int = int(user_id)
-        # Discord user IDs are 17-19 digits long
-        return 10**16 <= user_id_int <= 10**19
-    except (ValueError, TypeError):
+        return _MIN_USER_ID <= int(user_id) <= _MAX_USER_ID
+    except ValueError:
         return False
 
 def safe_divide(numerator, denominator, default=0):
@@ -136,3 +177,66 @@ def safe_divide(numerator, denominator, default=0):
         return numerator / denominator
     except (TypeError, ValueError):
         return default
+
+def dumps_json(data, pretty=False):
+    """Serialize data to compact JSON bytes, indented when pretty is set"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if ujson is not None:
+        return ujson.dumps(data, indent=2 if pretty else 0, ensure_ascii=False).encode()
+    # ensure_ascii=False skips escaping and matches orjson's UTF-8 output
+    if pretty:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode()
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+def loads_json(payload):
+    """Parse JSON from bytes or str, using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(payload)
+    if ujson is not None:
+        try:
+            return ujson.loads(payload)
+        except ValueError as e:
+            # Callers catch json.JSONDecodeError, which ujson's error doesn't subclass
+            raise json.JSONDecodeError(str(e), "", 0) from e
+    return json.loads(payload)
+
+# Process umask, read once at import (os.umask can only be read by setting it)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _new_file_mode(path):
+    """Mode for a rewrite of path: the existing file's, or what open() would give a new file"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+def write_atomic(path, payload):
+    """Write bytes to path atomically via a fsynced temp file and os.replace"""
+    directory, filename = os.path.split(path)
+    # Hidden temp name, so half-written files never match a listing prefix; unique
+    # per call, so concurrent writers never share (or move away) each other's file
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{filename}.", suffix=".tmp", dir=directory or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file as 0600; keep the permissions a plain open() would have
+        os.chmod(tmp_path, _new_file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Persist the rename itself; directories can't be opened this way on Windows
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory or ".", os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)